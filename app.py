@@ -1,14 +1,48 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Request, request
 from flasgger import Swagger
 import requests
-from datetime import datetime
+import redis
+from rq import Queue
+from rq.job import Job
+from rq.exceptions import NoSuchJobError
+import orjson
+import msgspec
+from typing import Dict, List, Optional, Union
+import hashlib
+import logging
+import logging.handlers
+import queue
+import atexit
+import socket
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.util.connection import allowed_gai_family
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import ciso8601
 import os
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Parse request JSON with orjson. Flask 2.1 predates JSONProvider, but Werkzeug's
+# get_json() goes through the request class's json_module.
+class ORJSONModule:
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+class ORJSONRequest(Request):
+    json_module = ORJSONModule
+
 app = Flask(__name__)
+app.request_class = ORJSONRequest
 swagger = Swagger(app)
 
 # WhatsApp Cloud API endpoint and authentication details
@@ -16,25 +50,264 @@ WHATSAPP_API_URL = 'https://graph.facebook.com/v17.0/139913512540275/messages'
 API_KEY = os.getenv("API_KEY")
 ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
 
-# Function to convert ISO timestamp to UNIX timestamp
+# Graph API `fields` templates for the analytics endpoints
+CONV_FIELDS_TMPL = "conversation_analytics.start({s}).end({e}).granularity({g}).phone_numbers([]).dimensions(['CONVERSATION_CATEGORY','CONVERSATION_TYPE','COUNTRY','PHONE'])"
+MSG_FIELDS_TMPL = "analytics.start({s}).end({e}).granularity({g})"
+
+# Request headers, fixed for the lifetime of the process
+GRAPH_HEADERS = {'Authorization': f'Bearer {ACCESS_TOKEN}'}
+WA_HEADERS = {
+    'Authorization': f'Bearer {API_KEY}',
+    'Content-Type': 'application/json'
+}
+
+# Log through a queue drained by a background thread so request threads never block on output
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING")
+log_queue = queue.SimpleQueue()
+logger = logging.getLogger("waapi")
+logger.setLevel(LOG_LEVEL)
+logger.propagate = False
+logger.addHandler(logging.handlers.QueueHandler(log_queue))
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+log_listener = logging.handlers.QueueListener(log_queue, log_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+# Maximum number of concurrent WhatsApp API requests per process, shared by all sends
+SEND_MAX_WORKERS = int(os.getenv("SEND_MAX_WORKERS", 100))
+SEND_EXECUTOR = ThreadPoolExecutor(max_workers=SEND_MAX_WORKERS, thread_name_prefix="wa-send")
+
+# Keep-alive connections per host; never fewer than the concurrent senders so no
+# connection opened during a send is discarded afterwards
+GRAPH_POOL_MAXSIZE = max(int(os.getenv("GRAPH_POOL_MAXSIZE", 100)), SEND_MAX_WORKERS)
+
+# Cache DNS lookups for the Graph API host so pooled connections don't block on the resolver
+GRAPH_HOST = 'graph.facebook.com'
+DNS_CACHE_TTL = 300
+dns_cache = {}
+system_getaddrinfo = socket.getaddrinfo
+
+def cached_getaddrinfo(host, port, *args, **kwargs):
+    if host != GRAPH_HOST:
+        return system_getaddrinfo(host, port, *args, **kwargs)
+
+    key = (host, port, args, tuple(sorted(kwargs.items())))
+    entry = dns_cache.get(key)
+    now = time.monotonic()
+    if entry and entry[0] > now:
+        return entry[1]
+
+    result = system_getaddrinfo(host, port, *args, **kwargs)
+    dns_cache[key] = (now + DNS_CACHE_TTL, result)
+    return result
+
+socket.getaddrinfo = cached_getaddrinfo
+
+# Resolve the Graph API host at startup, the same way urllib3 does when connecting
+try:
+    socket.getaddrinfo(GRAPH_HOST, 443, allowed_gai_family(), socket.SOCK_STREAM)
+except OSError:
+    pass
+
+# HTTP adapter that disables Nagle's algorithm and enables TCP keepalive on pooled connections
+class GraphAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = [
+            (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        ]
+        super().init_poolmanager(*args, **kwargs)
+
+# Shared HTTP session so connections to the Graph API are pooled and kept alive
+SESSION = requests.Session()
+adapter = GraphAdapter(
+    pool_connections=20,
+    pool_maxsize=GRAPH_POOL_MAXSIZE,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 502, 503, 504], raise_on_status=False)
+)
+SESSION.mount('https://', adapter)
+SESSION.headers.update(GRAPH_HEADERS)
+
+# Redis cache for slow-changing Graph API data
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+R = redis.Redis.from_url(REDIS_URL, decode_responses=True, socket_connect_timeout=1, socket_timeout=1)
+
+# Queue for sends processed by a separate `rq worker whatsapp` process; RQ stores pickled
+# jobs, so it needs its own connection without response decoding
+SEND_QUEUE = Queue('whatsapp', connection=redis.Redis.from_url(REDIS_URL))
+SEND_RESULT_TTL = 3600
+
+# Cache lifetimes in seconds
+# Key namespaces owned by this app's cache; invalidation is limited to these
+CACHE_PREFIXES = ('wa:', 'analytics:')
+
+TEMPLATES_CACHE_TTL = 300
+PHONE_STATUS_CACHE_TTL = 60
+# Analytics for ranges that ended over a day ago never change, so they are kept much longer
+ANALYTICS_HISTORICAL_CACHE_TTL = 30 * 86400
+ANALYTICS_RECENT_CACHE_TTL = 60
+
+# Request bodies, validated and decoded in a single pass by msgspec
+class SendRequest(msgspec.Struct):
+    recipients: List[str]
+    template_name: str
+    template_variables: Dict[str, Union[str, int, float]] = {}
+
+class ConversationAnalyticsRequest(msgspec.Struct):
+    start_date: str
+    end_date: str
+    granularity: str = 'MONTHLY'
+
+class TemplateAnalyticsRequest(msgspec.Struct):
+    start_date: str
+    end_date: str
+    template_ids: List[Union[str, int]]
+    granularity: Optional[str] = None
+
+class MessagingAnalyticsRequest(msgspec.Struct):
+    start_date: str
+    end_date: str
+    granularity: Optional[str] = None
+
+# Function to build a JSON response with orjson, which encodes straight to bytes
+def ojsonify(obj, status=200):
+    return app.response_class(orjson.dumps(obj), status=status, mimetype='application/json')
+
+# Function to convert ISO timestamp to UNIX timestamp; dashboards resend the same dates, so results are memoized
+@lru_cache(maxsize=1024)
 def iso_to_unix(iso_timestamp):
-    return int(datetime.fromisoformat(iso_timestamp).timestamp())
+    return int(ciso8601.parse_datetime(iso_timestamp).timestamp())
+
+# Functions to read and write the cache; if Redis is unavailable requests go straight to the API
+def cache_get(key):
+    try:
+        return R.get(key)
+    except redis.RedisError:
+        return None
+
+def cache_set(key, ttl, value):
+    try:
+        R.setex(key, ttl, value)
+    except redis.RedisError:
+        pass
+
+# Function to make API requests, serving successful responses from the cache for ttl seconds.
+# Response bodies are passed through as received rather than decoded and re-encoded.
+def make_request(url, params=None, ttl=TEMPLATES_CACHE_TTL):
+    key = f"wa:{url}:{sorted((params or {}).items())}"
+    cached = cache_get(key)
+    if cached:
+        return app.response_class(cached, mimetype='application/json')
 
-# Function to make API requests
-def make_request(url, headers, params=None):
     try:
         # Make the GET request
-        response = requests.get(url, headers=headers, params=params)
+        response = SESSION.get(url, params=params)
+        response.raise_for_status()
+    except requests.HTTPError:
+        return ojsonify({"error": f"Request failed with status code: {response.status_code}"})
+    except requests.RequestException as e:
+        return ojsonify({"error": f"Request Exception: {e}"})
+
+    cache_set(key, ttl, response.text)
+    return app.response_class(response.content, mimetype='application/json')
 
-        # Check if the request was successful (status code 200)
-        if response.status_code == 200:
-            # Return JSON response
-            return response.json()
-        else:
-            return {"error": f"Request failed with status code: {response.status_code}"}
+# Function to pick the cache lifetime of an analytics response from the end of its time range
+def analytics_cache_ttl(end_unix):
+    if end_unix < int(time.time()) - 86400:
+        return ANALYTICS_HISTORICAL_CACHE_TTL
+    return ANALYTICS_RECENT_CACHE_TTL
 
+# Function to return a cached analytics response
+def cached_analytics_response(cached):
+    return app.response_class(cached, mimetype='application/json', headers={'X-Cache': 'HIT'})
+
+# Function to pass a Graph API analytics response through to the client, caching it when successful
+def analytics_response(response, cache_key, end_unix):
+    try:
+        response.raise_for_status()
+    except requests.HTTPError:
+        return ojsonify({"error": response.text}, response.status_code)
+
+    cache_set(cache_key, analytics_cache_ttl(end_unix), response.text)
+    return app.response_class(response.content, mimetype='application/json', headers={'X-Cache': 'MISS'})
+
+# Function to send a single encoded WhatsApp message and report its outcome
+def post_message(recipient, body):
+    try:
+        response = SESSION.post(WHATSAPP_API_URL, data=body, headers=WA_HEADERS)
     except requests.RequestException as e:
-        return {"error": f"Request Exception: {e}"}
+        logger.warning("wa_request_failed recipient=%s error=%s", recipient, e, extra={"recipient": recipient})
+        return {"recipient": recipient, "error": f"Request Exception: {e}"}
+
+    logger.info("wa_response recipient=%s status=%s", recipient, response.status_code,
+                extra={"recipient": recipient, "status": response.status_code})
+
+    # Non-JSON bodies (e.g. a proxy's HTML error page) are returned as text alongside the status
+    try:
+        response_data = response.json()
+    except ValueError:
+        response_data = response.text
+
+    return {"recipient": recipient, "status": response.status_code, "response": response_data}
+
+# Function to build the encoded WhatsApp API payload for each recipient of a template message
+def build_payloads(recipients, template_name, template_variables):
+    # Everything except the recipient and its name is the same for every message, so the
+    # payload is encoded once with placeholders and the per-recipient values spliced in
+    variable_names = str(template_variables.get('variable1', '')).split(',')
+    template = orjson.dumps({
+        "messaging_product": "whatsapp",
+        "recipient_type": "individual",
+        "to": "__TO__",
+        "type": "template",
+        "template": {
+            # Caller-supplied values come after the placeholders, so the first match is always the placeholder
+            "language": {
+                "code": "en_US"
+            },
+            "components": [
+                {
+                    "type": "body",
+                    "parameters": [
+                        {
+                            "type": "text",
+                            "text": "__USER__"
+                        },
+                        {
+                            "type": "text",
+                            "text": template_variables.get('variable2', '')
+                        },
+                        {
+                            "type": "text",
+                            "text": template_variables.get('variable3', '')
+                        }
+                    ]
+                }
+            ],
+            "name": template_name
+        }
+    })
+    head, _, rest = template.partition(b'"__TO__"')
+    middle, _, tail = rest.partition(b'"__USER__"')
+
+    # Each recipient is messaged once, keeping the name of its first occurrence
+    payloads = []
+    seen = set()
+    for i, recipient in enumerate(recipients):
+        if recipient in seen:
+            continue
+        seen.add(recipient)
+        user = variable_names[i] if i < len(variable_names) else template_variables.get(f'user{i+1}', '')
+        body = b''.join((head, orjson.dumps(recipient), middle, orjson.dumps(user), tail))
+        payloads.append((recipient, body))
+
+    return payloads
+
+# Function to send payloads concurrently, preserving their order in the results
+def send_payloads(payloads):
+    futures = [SEND_EXECUTOR.submit(post_message, recipient, body) for recipient, body in payloads]
+    return [future.result() for future in futures]
 
 @app.route('/send', methods=['POST'])
 def send_message():
@@ -66,69 +339,107 @@ def send_message():
               example: {"variable1": "John,Doe", "variable2": "Value2", "variable3": "Value3"}
               description: Optional variables to be included in the template.
     responses:
-      200:
-        description: Messages sent successfully.
+      202:
+        description: Messages queued for sending, with the job ID to poll and the number of duplicate recipients skipped.
       400:
         description: Missing required parameters or invalid request format.
+      503:
+        description: Send queue unavailable.
     """
-    message_data = request.get_json()
-    recipients = message_data.get('recipients')
-    template_name = message_data.get('template_name')
-    template_variables = message_data.get('template_variables', {})
+    try:
+        message = msgspec.json.decode(request.get_data(), type=SendRequest)
+    except msgspec.DecodeError:
+        return ojsonify({"error": "Missing required parameters"}, 400)
 
-    if not recipients or not template_name:
-        return jsonify({"error": "Missing required parameters"}), 400
+    if not message.recipients or not message.template_name:
+        return ojsonify({"error": "Missing required parameters"}, 400)
 
-    variable_names = template_variables.get('variable1', '').split(',')
-    for i, recipient in enumerate(recipients):
-        if i < len(variable_names):
-            template_variables[f'user{i+1}'] = variable_names[i]
-
-        payload = {
-            "messaging_product": "whatsapp",
-            "recipient_type": "individual",
-            "to": recipient,
-            "type": "template",
-            "template": {
-                "name": template_name,
-                "language": {
-                    "code": "en_US"
-                },
-                "components": [
-                    {
-                        "type": "body",
-                        "parameters": [
-                            {
-                                "type": "text",
-                                "text": template_variables.get(f'user{i+1}', '')
-                            },
-                            {
-                                "type": "text",
-                                "text": template_variables.get('variable2', '')
-                            },
-                            {
-                                "type": "text",
-                                "text": template_variables.get('variable3', '')
-                            }
-                        ]
-                    }
-                ]
-            }
-        }
+    payloads = build_payloads(message.recipients, message.template_name, message.template_variables)
+    duplicates = len(message.recipients) - len(payloads)
 
-        headers = {
-            'Authorization': f'Bearer {API_KEY}',
-            'Content-Type': 'application/json'
-        }
+    try:
+        job = SEND_QUEUE.enqueue(send_payloads, payloads, result_ttl=SEND_RESULT_TTL)
+    except redis.RedisError as e:
+        return ojsonify({"error": f"Send queue unavailable: {e}"}, 503)
 
-        response = requests.post(WHATSAPP_API_URL, json=payload, headers=headers)
+    return ojsonify({"message": "Messages queued for sending", "job_id": job.id, "duplicates": duplicates}, 202)
 
-        response_data = response.json()
+@app.route('/send/<job_id>')
+def send_status(job_id):
+    """
+    Get the status of a queued WhatsApp send.
+    ---
+    parameters:
+      - name: job_id
+        in: path
+        type: string
+        required: true
+        description: The job ID returned by /send.
+    responses:
+      200:
+        description: Job status, with the WhatsApp API result for each recipient once finished.
+      404:
+        description: Unknown or expired job.
+      503:
+        description: Send queue unavailable.
+    """
+    try:
+        job = Job.fetch(job_id, connection=SEND_QUEUE.connection)
+        status = job.get_status()
+    except NoSuchJobError:
+        return ojsonify({"error": "Job not found"}, 404)
+    except redis.RedisError as e:
+        return ojsonify({"error": f"Send queue unavailable: {e}"}, 503)
 
-        print(f"WhatsApp API Response for {recipient}:")
-        print(response_data)
+    return ojsonify({"job_id": job.id, "status": status, "results": job.result})
 
-    return jsonify({"message": "Messages sent successfully!"}), 200
+@app.route('/send_batch', methods=['POST'])
+def send_batch():
+    """
+    Send several WhatsApp template messages in a single request.
+    ---
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: array
+          items:
+            $ref: '#/definitions/SendMessage'
+    responses:
+      200:
+        description: Messages sent, with the WhatsApp API results for each message in request order.
+      400:
+        description: Missing required parameters or invalid request format.
+    """
+    try:
+        messages = msgspec.json.decode(request.get_data(), type=List[SendRequest])
+    except msgspec.DecodeError as e:
+        return ojsonify({"error": f"Invalid message list: {e}"}, 400)
+
+    if not messages:
+        return ojsonify({"error": "A non-empty list of messages is required"}, 400)
+
+    batches = []
+    for index, message in enumerate(messages):
+        if not message.recipients or not message.template_name:
+            return ojsonify({"error": f"Missing required parameters at index {index}"}, 400)
+
+        batches.append((message, build_payloads(message.recipients, message.template_name, message.template_variables)))
+
+    # Dispatch every payload of the batch together, then split the results back per message
+    results = send_payloads([payload for _, payloads in batches for payload in payloads])
+    response = []
+    offset = 0
+    for message, payloads in batches:
+        response.append({
+            "template_name": message.template_name,
+            "results": results[offset:offset + len(payloads)],
+            "duplicates": len(message.recipients) - len(payloads)
+        })
+        offset += len(payloads)
+
+    return ojsonify(response, 200)
 
 @app.route('/conversation_analytics', methods=['POST'])
 def get_conversation_analytics():
@@ -164,24 +475,26 @@ def get_conversation_analytics():
       400:
         description: Missing required parameters or invalid request format.
     """
-    data = request.json
-
-    if 'start_date' in data and 'end_date' in data:
-        start_unix = iso_to_unix(data['start_date'])
-        end_unix = iso_to_unix(data['end_date'])
-        granularity = data.get('granularity', 'MONTHLY')
-        endpoint = f"https://graph.facebook.com/v18.0/118254494612532"
-        params = {
-            'fields': f"conversation_analytics.start({start_unix}).end({end_unix}).granularity({granularity}).phone_numbers([]).dimensions(['CONVERSATION_CATEGORY','CONVERSATION_TYPE','COUNTRY','PHONE'])",
-            'access_token': ACCESS_TOKEN
-        }
-        response = requests.get(endpoint, params=params)
-        if response.ok:
-            return jsonify(response.json())
-        else:
-            return jsonify({"error": response.text}), response.status_code
-    else:
-        return jsonify({"error": "Start date and end date are required in ISO format in the request body."}), 400
+    try:
+        data = msgspec.json.decode(request.get_data(), type=ConversationAnalyticsRequest)
+        start_unix = iso_to_unix(data.start_date)
+        end_unix = iso_to_unix(data.end_date)
+    except (msgspec.DecodeError, ValueError):
+        return ojsonify({"error": "Start date and end date are required in ISO format in the request body."}, 400)
+
+    granularity = data.granularity
+    cache_key = f"analytics:conv:{start_unix}:{end_unix}:{granularity}"
+    cached = cache_get(cache_key)
+    if cached:
+        return cached_analytics_response(cached)
+
+    endpoint = f"https://graph.facebook.com/v18.0/118254494612532"
+    params = {
+        'fields': CONV_FIELDS_TMPL.format_map({'s': start_unix, 'e': end_unix, 'g': granularity}),
+        'access_token': ACCESS_TOKEN
+    }
+    response = SESSION.get(endpoint, params=params)
+    return analytics_response(response, cache_key, end_unix)
 
 @app.route('/template_analytics', methods=['POST'])
 def get_template_analytics():
@@ -223,31 +536,31 @@ def get_template_analytics():
       400:
         description: Missing required parameters or invalid request format.
     """
-    data = request.json
-    access_token = ACCESS_TOKEN  # Replace with your Facebook access token
-
-    if 'start_date' in data and 'end_date' in data and 'template_ids' in data:
-        start_unix = iso_to_unix(data['start_date'])
-        end_unix = iso_to_unix(data['end_date'])
-        granularity = data.get('granularity')
-        template_ids = data['template_ids']
-
-        api_url = 'https://graph.facebook.com/v18.0/118254494612532/template_analytics'
-        params = {
-            'start': start_unix,
-            'end': end_unix,
-            'granularity': granularity,
-            'metric_types': "['SENT','DELIVERED','READ','CLICKED']",
-            'template_ids': template_ids
-        }
-        headers = {'Authorization': f'Bearer {access_token}'}
-        response = requests.get(api_url, params=params, headers=headers)
-        if response.ok:
-            return jsonify(response.json())
-        else:
-            return jsonify({"error": response.text}), response.status_code
-    else:
-        return jsonify({"error": "Start date, end date, and template IDs are required in the request body."}), 400
+    try:
+        data = msgspec.json.decode(request.get_data(), type=TemplateAnalyticsRequest)
+        start_unix = iso_to_unix(data.start_date)
+        end_unix = iso_to_unix(data.end_date)
+    except (msgspec.DecodeError, ValueError):
+        return ojsonify({"error": "Start date, end date, and template IDs are required in the request body."}, 400)
+
+    granularity = data.granularity
+    template_ids = data.template_ids
+    template_ids_hash = hashlib.sha1(','.join(sorted(map(str, template_ids))).encode()).hexdigest()
+    cache_key = f"analytics:tmpl:{start_unix}:{end_unix}:{granularity}:{template_ids_hash}"
+    cached = cache_get(cache_key)
+    if cached:
+        return cached_analytics_response(cached)
+
+    api_url = 'https://graph.facebook.com/v18.0/118254494612532/template_analytics'
+    params = {
+        'start': start_unix,
+        'end': end_unix,
+        'granularity': granularity,
+        'metric_types': "['SENT','DELIVERED','READ','CLICKED']",
+        'template_ids': template_ids
+    }
+    response = SESSION.get(api_url, params=params)
+    return analytics_response(response, cache_key, end_unix)
 
 # Define the rest of the endpoints...
 
@@ -285,25 +598,26 @@ def get_messaging_analytics():
       400:
         description: Missing required parameters or invalid request format.
     """
-    data = request.json
-    access_token = ACCESS_TOKEN  # Replace with your Facebook access token
-
-    if 'start_date' in data and 'end_date' in data:
-        start_unix = iso_to_unix(data['start_date'])
-        end_unix = iso_to_unix(data['end_date'])
-        granularity = data.get('granularity')
-        url = f"https://graph.facebook.com/v18.0/118254494612532"
-        params = {
-            "fields": f"analytics.start({start_unix}).end({end_unix}).granularity({granularity})",
-            "access_token": access_token
-        }
-        response = requests.get(url, params=params)
-        if response.ok:
-            return jsonify(response.json())
-        else:
-            return jsonify({"error": response.text}), response.status_code
-    else:
-        return jsonify({"error": "Start date and end date are required in ISO format in the request body."}), 400
+    try:
+        data = msgspec.json.decode(request.get_data(), type=MessagingAnalyticsRequest)
+        start_unix = iso_to_unix(data.start_date)
+        end_unix = iso_to_unix(data.end_date)
+    except (msgspec.DecodeError, ValueError):
+        return ojsonify({"error": "Start date and end date are required in ISO format in the request body."}, 400)
+
+    granularity = data.granularity
+    cache_key = f"analytics:msg:{start_unix}:{end_unix}:{granularity}"
+    cached = cache_get(cache_key)
+    if cached:
+        return cached_analytics_response(cached)
+
+    url = f"https://graph.facebook.com/v18.0/118254494612532"
+    params = {
+        "fields": MSG_FIELDS_TMPL.format_map({'s': start_unix, 'e': end_unix, 'g': granularity}),
+        "access_token": ACCESS_TOKEN
+    }
+    response = SESSION.get(url, params=params)
+    return analytics_response(response, cache_key, end_unix)
 
 @app.route('/approved_templates')
 def approved_template():
@@ -317,16 +631,12 @@ def approved_template():
         description: Internal server error.
     """
     whatsapp_url = "https://graph.facebook.com/v18.0/118254494612532/message_templates"
-    whatsapp_headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}"  # Replace with your Facebook access token
-    }
     whatsapp_params = {
         "fields": "name,status",
         "status": "APPROVED"
     }
 
-    result = make_request(whatsapp_url, whatsapp_headers, whatsapp_params)
-    return jsonify(result)
+    return make_request(whatsapp_url, whatsapp_params)
 
 @app.route('/rejected_templates')
 def rejected_templates():
@@ -340,16 +650,12 @@ def rejected_templates():
         description: Internal server error.
     """
     whatsapp_url = "https://graph.facebook.com/v18.0/118254494612532/message_templates"
-    whatsapp_headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}"  
-    }
     whatsapp_params = {
         "fields": "name,status",
         "status": "REJECTED"
     }
 
-    result = make_request(whatsapp_url, whatsapp_headers, whatsapp_params)
-    return jsonify(result)
+    return make_request(whatsapp_url, whatsapp_params)
 
 @app.route('/approved_template_contents')
 def approved_template_contents():
@@ -363,16 +669,12 @@ def approved_template_contents():
         description: Internal server error.
     """
     whatsapp_url = "https://graph.facebook.com/v18.0/118254494612532/message_templates"
-    whatsapp_headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}"  # Replace with your Facebook access token
-    }
     whatsapp_params = {
         "fields": "name,status,components",
         "status": "APPROVED"
     }
 
-    result = make_request(whatsapp_url, whatsapp_headers, whatsapp_params)
-    return jsonify(result)
+    return make_request(whatsapp_url, whatsapp_params)
 
 @app.route('/rejected_template_contents')
 def rejected_template_contents():
@@ -387,16 +689,12 @@ def rejected_template_contents():
     
     """
     whatsapp_url = "https://graph.facebook.com/v18.0/118254494612532/message_templates"
-    whatsapp_headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}"
-    }
     whatsapp_params = {
         "fields": "name,status,components",
         "status": "REJECTED"
     }
 
-    result = make_request(whatsapp_url, whatsapp_headers, whatsapp_params)
-    return jsonify(result)
+    return make_request(whatsapp_url, whatsapp_params)
 
 @app.route('/phone_number_status')
 def phone_number_status():
@@ -410,16 +708,51 @@ def phone_number_status():
         description: Internal server error.
     """
     whatsapp_url = "https://graph.facebook.com/v18.0/139913512540275"  # Replace with your WhatsApp phone number ID
-    whatsapp_headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}"
-    }
-
-    result = make_request(whatsapp_url, whatsapp_headers)
-    return jsonify(result)
-
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
 
+    return make_request(whatsapp_url, ttl=PHONE_STATUS_CACHE_TTL)
 
+@app.route('/cache/invalidate', methods=['POST'])
+def invalidate_cache():
+    """
+    Invalidate cached Graph API responses.
+    ---
+    parameters:
+      - name: body
+        in: body
+        required: false
+        schema:
+          id: CacheInvalidate
+          properties:
+            prefix:
+              type: string
+              example: "wa:"
+              description: Only cache keys starting with this prefix are removed (defaults to all cached template, phone number and analytics reads). Must start with "wa:" or "analytics:".
+    responses:
+      200:
+        description: Number of cache entries removed.
+      400:
+        description: Invalid request body or prefix.
+      503:
+        description: Cache unavailable.
+    """
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return ojsonify({"error": "Request body must be a JSON object."}, 400)
+
+    prefix = data.get('prefix')
+    if prefix is None:
+        prefixes = CACHE_PREFIXES
+    elif isinstance(prefix, str) and prefix.startswith(CACHE_PREFIXES):
+        prefixes = (prefix,)
+    else:
+        return ojsonify({"error": f"Prefix must be a string starting with one of: {', '.join(CACHE_PREFIXES)}"}, 400)
 
+    try:
+        keys = [key for prefix in prefixes for key in R.scan_iter(match=f"{prefix}*")]
+        deleted = R.delete(*keys) if keys else 0
+    except redis.RedisError as e:
+        return ojsonify({"error": f"Cache unavailable: {e}"}, 503)
 
+    return ojsonify({"deleted": deleted})